@@ -1,11 +1,12 @@
 import math
-import matplotlib.pyplot as plt
+import numpy as np
 import os.path as path
 import pandas as pd
 import scipy.stats as st
 import threading
 from utils.database_handler import DataframeConnection
-from utils.custom_wx_objects import ColumnSelectionDialog, MatplotlibFrame
+from utils.custom_wx_objects import ColumnSelectionDialog, MatplotlibFrame, VirtualListCtrl, plural_suffix
+from utils.distribution_fitting import find_best_fitted_distribution
 import warnings
 import wx
 
@@ -25,6 +26,8 @@ class SQLiteViewer(wx.Frame):
         "ID_REGRESSION_ANALYSIS": 1009,
         "ID_ANOVA": 1010
     }
+    COUNTED_PAGES_AHEAD = 10
+    SEARCH_DELAY_MS = 250
 
     def __init__(self):
         super().__init__(None, title="SQLite Viewer: No database loaded", size=(900, 500))
@@ -32,6 +35,7 @@ class SQLiteViewer(wx.Frame):
         self.db = None
         self.current_page = 1
         self.total_pages = 0
+        self.is_row_count_exact = True
         self.sort_column = None
         self.sort_order = False
         self.search_query = None
@@ -59,7 +63,8 @@ class SQLiteViewer(wx.Frame):
         self.next_page_button = wx.Button(panel, label="Next page")
         self.next_page_button.Enable(False)
         top_toolbar.AddMany([(self.table_switcher, 0, wx.ALL, 5), (self.search_ctrl, 0, wx.ALL, 5), (self.next_page_button, 0, wx.ALL, 5)])
-        self.list_ctrl = wx.ListCtrl(panel, style=wx.LC_REPORT)
+        self.list_ctrl = VirtualListCtrl(panel)
+        self.search_timer = wx.Timer(self)
         sizer.AddMany([(self.table_label, 0, wx.LEFT | wx.TOP, 5), (top_toolbar, 0, wx.ALL, 0), (self.list_ctrl, 1, wx.EXPAND | wx.ALL, 5)])
         self.CreateStatusBar()
         self.bind_events()
@@ -90,6 +95,8 @@ class SQLiteViewer(wx.Frame):
         self.next_page_button.Bind(wx.EVT_BUTTON, self.on_page_change)
         self.list_ctrl.Bind(wx.EVT_LIST_COL_CLICK, self.on_column_click)
         self.search_ctrl.Bind(wx.EVT_SEARCHCTRL_SEARCH_BTN, self.on_search)
+        self.search_ctrl.Bind(wx.EVT_TEXT, self.on_search_text)
+        self.Bind(wx.EVT_TIMER, self.on_search, self.search_timer)
         self.search_ctrl.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self.on_search_cancel)
 
     def create_menu_bar(self):
@@ -103,11 +110,13 @@ class SQLiteViewer(wx.Frame):
 
         view_menu, items_per_page_submenu = wx.Menu(), wx.Menu()
         items_per_page_options = (5, 10, 25, 50, 100, 250, 500, 1000)
+        self._items_per_page_by_id = {}
 
         for items_per_page in items_per_page_options:
             menu_item = items_per_page_submenu.AppendRadioItem(-1, f"{items_per_page:,} items per page", help=f"Show {items_per_page:,} items per page")
             if items_per_page == self.items_per_page:
                 menu_item.Check()
+            self._items_per_page_by_id[menu_item.GetId()] = items_per_page
             self.Bind(wx.EVT_MENU, self.on_set_items_per_page, menu_item)
 
         view_menu.AppendSubMenu(items_per_page_submenu, "Set items per page")
@@ -145,8 +154,11 @@ class SQLiteViewer(wx.Frame):
             db = DataframeConnection(db_file=file_path)
             table_names = db.get_table_or_sheet_names()
             if not table_names:
+                db.close()
                 wx.MessageBox("No tables found in database", "Error opening database", wx.OK | wx.ICON_ERROR)
                 return
+            if self.db:
+                self.db.close()
             self.db = db
         except Exception as e:
             wx.MessageBox(f"Error opening database due to:\n{str(e)}", "Error", wx.OK | wx.ICON_ERROR)
@@ -163,12 +175,12 @@ class SQLiteViewer(wx.Frame):
         self.load_table_data(table_name=table_names[0], page_size=self.items_per_page)
         self.SetTitle(f"SQLite Viewer: Showing database \"{path.basename(file_path)}\"")
 
-    def load_table_data(self, table_name: str, page_number: int = 1, page_size: int = 250, sort_column: str | None = None, sort_order: bool = False, search_query: str | None = None, set_status: bool = True):
+    def load_table_data(self, table_name: str, page_number: int | None = 1, page_size: int = 250, sort_column: str | None = None, sort_order: bool = False, search_query: str | None = None, set_status: bool = True):
         """
         Prepares the dataframes for the specified table and loads the first page, for performance reasons within a separate thread
 
         :param table_name: The name of the table to load
-        :param page_number: The page number to load
+        :param page_number: The page number to load, or None to load the last page
         :param page_size: The number of rows to load per page
         :param sort_column: The name of the column to sort by
         :param sort_order: The order to sort by, True for ascending, False for descending (ignored if sort_column is None)
@@ -176,16 +188,27 @@ class SQLiteViewer(wx.Frame):
         :param set_status: Whether to update the status bar text
         """
         def _worker():
+            nonlocal page_number
             # TODO: Kill thread if another table is selected before this one is loaded
             with self.list_ctrl_lock:
                 self.save_column_attr(table_name=table_name)
 
                 try:
-                    df = self.db.get_filtered_sorted_df(table_name=table_name, sort_column=sort_column, sort_order=sort_order, search_query=search_query)
+                    if page_number is None:
+                        # The last page needs an exact count, even for searches whose count is otherwise stopped early
+                        total_rows, is_exact = self.db.get_row_count(table_name=table_name, search_query=search_query)
+                        page_number = self.current_page = max(1, math.ceil(total_rows / page_size))
+                    else:
+                        # Searches are only counted a few pages past the current one, the count grows while paging forward
+                        count_limit = (page_number + self.COUNTED_PAGES_AHEAD) * page_size if search_query else None
+                        total_rows, is_exact = self.db.get_row_count(table_name=table_name, search_query=search_query, limit=count_limit)
                     offset = (page_number - 1) * page_size
-                    rows = df.iloc[offset:offset+page_size].values.tolist()
-                    total_rows = len(df.index)
-                    self.list_ctrl.ShowSortIndicator(col=df.columns.tolist().index(sort_column), ascending=sort_order) if sort_column else self.list_ctrl.RemoveSortIndicator()
+                    df = self.db.get_page(table_name=table_name, offset=offset, limit=page_size, sort_column=sort_column, sort_order=sort_order, search_query=search_query)
+                    df = df.assign(**{column: df[column].dt.strftime("%Y-%m-%d") for column in df.attrs.get("date_columns", [])})
+                    # An object array of Python str, a fixed-width string array would make every cell as wide as the longest one
+                    cells, columns = np.frompyfunc(str, 1, 1)(df.to_numpy(dtype=object, na_value="")), df.columns.tolist()
+                    more_rows = "" if is_exact else "+"
+                    self.list_ctrl.ShowSortIndicator(col=columns.index(sort_column), ascending=sort_order) if sort_column else self.list_ctrl.RemoveSortIndicator()
                 except Exception as e:
                     wx.CallAfter(self.list_ctrl.ClearAll)
                     wx.CallAfter(self.next_page_button.Enable, False)
@@ -193,21 +216,26 @@ class SQLiteViewer(wx.Frame):
                     wx.CallAfter(self.SetStatusText, "Error opening table")
                     raise e
 
-                if not rows:
+                if not len(cells):
                     wx.CallAfter(self.list_ctrl.ClearAll)
                     wx.CallAfter(self.next_page_button.Enable, False)
                     wx.CallAfter(wx.MessageBox, f"No data found in table \"{table_name}\"", "Error displaying table", wx.OK | wx.ICON_ERROR)
                     wx.CallAfter(self.SetStatusText, "No data found in table")
                     return
 
-                self.total_pages = math.ceil(total_rows / page_size)
+                widest_cells = cells[np.argmax(np.frompyfunc(len, 1, 1)(cells).astype(np.int64), axis=0), np.arange(cells.shape[1])]
+                self.total_pages, self.is_row_count_exact = math.ceil(total_rows / page_size), is_exact
                 self.next_page_button.Enable(self.total_pages > 1)
-                wx.CallAfter(self.display_table, table_name=table_name, rows=rows, columns=df.columns.tolist())
-                wx.CallAfter(self.SetStatusText, f"Showing table: {table_name}, rows: {total_rows:,}, page: {page_number:,} of {self.total_pages:,}") if set_status else None
+                wx.CallAfter(self.display_table, table_name=table_name, cells=cells, widest_cells=widest_cells, columns=columns)
+                wx.CallAfter(self.SetStatusText, f"Showing table: {table_name}, rows: {total_rows:,}{more_rows}, page: {page_number:,} of {self.total_pages:,}{more_rows}") if set_status else None
+
+            if page_number < self.total_pages:
+                # Warms the page cache of the database connection, so paging forward is served without a query
+                threading.Thread(target=self.db.get_page, kwargs=dict(table_name=table_name, offset=page_number * page_size, limit=page_size, sort_column=sort_column, sort_order=sort_order, search_query=search_query), name="prefetch_page", daemon=True).start()
 
         thread = threading.Thread(target=_worker, name="load_table_data", daemon=True)
         thread.start()
-        wx.CallLater(600, lambda: self.progress_dialog(thread=thread) if thread.is_alive() else None)
+        self.progress_dialog_when_slow(thread=thread)
 
     def save_column_attr(self, table_name: str):
         """
@@ -220,34 +248,37 @@ class SQLiteViewer(wx.Frame):
             self.column_attr[previous_table] = {
                 "col_order": self.list_ctrl.GetColumnsOrder() if self.list_ctrl.GetColumnCount() else None,
                 "col_widths": {
-                    column: (self.list_ctrl.GetColumnWidth(i)) for i, column in enumerate(
-                        [self.list_ctrl.GetColumn(i).GetText() for i in range(self.list_ctrl.GetColumnCount())]
-                    )
+                    column: (self.list_ctrl.GetColumnWidth(i)) for i, column in enumerate(self.list_ctrl.columns)
                 }
             }
 
-    def display_table(self, table_name: str, rows: list, columns: list): 
+    def display_table(self, table_name: str, cells: np.ndarray, widest_cells: np.ndarray, columns: list): 
         """
-        Displays the specified rows and columns in the list control and applies the column order and widths if they exist in self.column_attr
+        Displays the specified cells and columns in the list control and applies the column order and widths if they exist in self.column_attr
 
         :param table_name: The name of the table to display
-        :param rows: The rows to display
+        :param cells: The pre-stringified cells to display as a two-dimensional array
+        :param widest_cells: The longest cell of each column
         :param columns: The columns to display
         """
-        self.list_ctrl.ClearAll()
-        for i, column in enumerate(columns):
-            width = self.column_attr.get(table_name, {}).get("col_widths", {}).get(column, self.list_ctrl.GetTextExtent(column)[0] + 40)
-            self.list_ctrl.InsertColumn(i, column, width=width)
-        for i, row in enumerate(rows):
-            self.list_ctrl.InsertItem(i, str(row[0]))
-            for j, cell in enumerate(row[1:], start=1):
-                self.list_ctrl.SetItem(i, j, str(cell))
+        col_widths = self.column_attr.get(table_name, {}).get("col_widths", {})
+        self.list_ctrl.set_columns(columns, [col_widths.get(column, self.list_ctrl.GetTextExtent(column)[0] + 40) for column in columns])
+        self.list_ctrl.set_cells(cells, widest_cells)
         if column_order := self.column_attr.get(table_name, {}).get("col_order"):
             self.list_ctrl.SetColumnsOrder(column_order)
         
+    def progress_dialog_when_slow(self, thread: threading.Thread, delay_ms: int = 600):
+        """
+        Displays a progress dialog for the specified thread if it is still running after the delay, so quick operations do not flash a dialog
+
+        :param thread: The thread to check
+        :param delay_ms: The delay in milliseconds before checking the thread
+        """
+        wx.CallLater(delay_ms, lambda: self.progress_dialog(thread=thread) if thread.is_alive() else None)
+
     def progress_dialog(self, thread: threading.Thread):
         """
-        Displays a progress dialog while the specified thread is alive
+        Displays a progress dialog while the specified thread is alive, the dialog is pulsed and destroyed by a timer so the event loop keeps running
         
         :param thread: The thread to check
         """
@@ -256,9 +287,18 @@ class SQLiteViewer(wx.Frame):
                 return
 
         progress_dialog = wx.ProgressDialog("Processing data", "Processing data, please wait...", maximum=100, parent=self, style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE)
-        while thread.is_alive():
-            progress_dialog.Pulse()
-        progress_dialog.Destroy()
+        timer = wx.Timer(self)
+
+        def _on_timer(event):
+            if thread.is_alive():
+                progress_dialog.Pulse()
+            else:
+                timer.Stop()
+                self.Unbind(wx.EVT_TIMER, handler=_on_timer, source=timer)
+                progress_dialog.Destroy()
+
+        self.Bind(wx.EVT_TIMER, _on_timer, timer)
+        timer.Start(100)
 
     def on_open(self, event):
         """
@@ -273,52 +313,48 @@ class SQLiteViewer(wx.Frame):
 
     def on_exit(self, event):
         """
-        Exits the application and makes sure all matplotlib figures are closed as well
+        Exits the application, the plot frames are closed along with it as children of the main window
         """
-        plt.close("all")
+        self.search_timer.Stop()
+        if self.db:
+            self.db.close()
         self.Destroy()
 
     def on_auto_size_columns(self, event):
         """
         Auto sizes the columns to fit the data
         """
-        for i in range(self.list_ctrl.GetColumnCount()):
-            header = self.list_ctrl.GetColumn(i).GetText()
-            width = max(
-                self.list_ctrl.GetTextExtent(header)[0] + 40,
-                max(
-                    self.list_ctrl.GetTextExtent(self.list_ctrl.GetItemText(item, i))[0] + 40
-                    for item in range(self.list_ctrl.GetItemCount())
-                )
-            )  
+        for i, (header, widest_cell) in enumerate(zip(self.list_ctrl.columns, self.list_ctrl.widest_cells)):
+            width = max(self.list_ctrl.GetTextExtent(header)[0], self.list_ctrl.GetTextExtent(widest_cell)[0]) + 40
             self.list_ctrl.SetColumnWidth(i, width)
 
     def on_reset_columns(self, event):
         """
         Resets the columns back to their default order and width
         """
-        if (column_count := self.list_ctrl.GetColumnCount()):
+        if (column_count := len(self.list_ctrl.columns)):
             self.list_ctrl.SetColumnsOrder(list(range(column_count))) 
-            for i in range(column_count):
-                self.list_ctrl.SetColumnWidth(i, self.list_ctrl.GetTextExtent(self.list_ctrl.GetColumn(i).GetText())[0] + 40)
+            for i, column in enumerate(self.list_ctrl.columns):
+                self.list_ctrl.SetColumnWidth(i, self.list_ctrl.GetTextExtent(column)[0] + 40)
 
     def on_copy(self, event):
         """
         Copies the selected rows to the clipboard as tab separated values with a newline between each row to allow pasting into Excel
         """
-        data_to_copy = []
+        selected_items = []
         item = self.list_ctrl.GetFirstSelected()
         while item != -1:
-            data_to_copy.append([self.list_ctrl.GetItem(item, col).GetText() for col in range(self.list_ctrl.GetColumnCount())])
+            selected_items.append(item)
             item = self.list_ctrl.GetNextSelected(item)
 
-        if data_to_copy:
+        if selected_items:
+            data_to_copy = self.list_ctrl.cells[selected_items]
             clipboard = wx.TextDataObject()
             clipboard.SetText("\n".join(["\t".join(row) for row in data_to_copy]))
             if wx.TheClipboard.Open():
                 wx.TheClipboard.SetData(clipboard)
                 wx.TheClipboard.Close()
-                self.SetStatusText(f"Copied {(row_count := len(data_to_copy))} row{'s'[:row_count^1]} to clipboard")
+                self.SetStatusText(f"Copied {(row_count := len(data_to_copy))} row{plural_suffix(row_count)} to clipboard")
             else:
                 self.SetStatusText("Error copying to clipboard")
         else:
@@ -328,14 +364,13 @@ class SQLiteViewer(wx.Frame):
         """
         Selects all rows in the list control
         """
-        for i in range(self.list_ctrl.GetItemCount()):
-            self.list_ctrl.Select(i)
+        self.list_ctrl.SetItemState(-1, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
 
     def on_set_items_per_page(self, event):
         """
         Changes the number of items that are displayed per page to the selected value
         """
-        self.items_per_page = int(event.GetEventObject().FindItemById(event.GetId()).GetItemLabelText().split(" ")[0].replace(",", ""))
+        self.items_per_page = self._items_per_page_by_id[event.GetId()]
         if self.db and self.list_ctrl.GetColumnCount():
             self.current_page = 1
             self.load_table_data(table_name=self.table_switcher.GetStringSelection(), page_number=self.current_page, page_size=self.items_per_page, sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
@@ -350,9 +385,9 @@ class SQLiteViewer(wx.Frame):
             if menu_id == self.CUSTOM_BIND_IDS["ID_DESCRIPTIVE_STATISTICS"]:
                 self.show_column_selection_dialog(callback=self.on_descriptive_statistics)
             elif menu_id == self.CUSTOM_BIND_IDS["ID_HISTOGRAM"]:
-                self.show_column_selection_dialog(callback=self.on_histogram, valid_dtypes=["number", "datetime"])
+                self.show_column_selection_dialog(callback=self.on_histogram, valid_dtypes=["number", "datetime"], sample_size=MatplotlibFrame.SAMPLE_SIZE)
             elif menu_id == self.CUSTOM_BIND_IDS["ID_SCATTER_PLOT"]:
-                self.show_column_selection_dialog(callback=self.on_scatter_plot, valid_dtypes=["number", "datetime"], min_column_count=2, max_column_count=2)
+                self.show_column_selection_dialog(callback=self.on_scatter_plot, valid_dtypes=["number", "datetime"], min_column_count=2, max_column_count=2, sample_size=MatplotlibFrame.SAMPLE_SIZE)
             elif menu_id == self.CUSTOM_BIND_IDS["ID_CORRELATION_MATRIX"]:
                 self.show_column_selection_dialog(callback=self.on_correlation_matrix, valid_dtypes=["number", "datetime"], min_column_count=2, min_data_count=10)
             elif menu_id == self.CUSTOM_BIND_IDS["ID_BEST_FITTED_DISTRIBUTION"]:
@@ -364,7 +399,7 @@ class SQLiteViewer(wx.Frame):
         else:
             wx.MessageBox("Unable to perform operation, please load a valid table first", "Invalid operation", wx.OK | wx.ICON_ERROR)
 
-    def show_column_selection_dialog(self, callback: callable, valid_dtypes: list | None = None, min_column_count: int = 1, max_column_count: int | None = None, min_data_count: int = 1):
+    def show_column_selection_dialog(self, callback: callable, valid_dtypes: list | None = None, min_column_count: int = 1, max_column_count: int | None = None, min_data_count: int = 1, sample_size: int | None = None):
         """
         Shows a dialog to select columns for the specified data analysis
 
@@ -373,25 +408,38 @@ class SQLiteViewer(wx.Frame):
         :param min_column_count: The minimum number of columns to select
         :param max_column_count: The maximum number of columns to select
         :param min_data_count: The minimum number of data rows required to perform the analysis
+        :param sample_size: The maximum number of rows to pass to the callback, rows are sampled randomly if the table is larger (only applied when no filters are in effect)
         """
-        df = self.db.get_df(table_name=self.table_switcher.GetStringSelection())
-        columns = [col for col in df.select_dtypes(include=valid_dtypes).columns.tolist() if df[col].isna().sum() != len(df)] if valid_dtypes else df.columns.tolist()
-        columns = [col for col in [self.list_ctrl.GetColumn(i).GetText() for i in self.list_ctrl.GetColumnsOrder()] if col in columns]
+        table_name = self.table_switcher.GetStringSelection()
+        columns = [self.list_ctrl.columns[i] for i in self.list_ctrl.GetColumnsOrder()]
+        if valid_dtypes:
+            schema = self.db.get_schema(table_name=table_name)
+            columns = [col for col in columns if col in schema and schema[col][0] in valid_dtypes and schema[col][1]]
         
         if len(columns) < min_column_count:
-            wx.MessageBox(f"Unable to perform operation, please load a table with at least {min_column_count} valid column{'s'[:min_column_count^1]}", "Invalid operation", wx.OK | wx.ICON_ERROR)
+            wx.MessageBox(f"Unable to perform operation, please load a table with at least {min_column_count} valid column{plural_suffix(min_column_count)}", "Invalid operation", wx.OK | wx.ICON_ERROR)
             return
         
         column_dialog = ColumnSelectionDialog(parent=self, columns=columns, min_count=min_column_count, max_count=max_column_count)
-        if column_dialog.ShowModal() == wx.ID_OK:
-            selected_columns = [columns[i] for i in column_dialog.selected_columns]
-            if not column_dialog.ignore_filters:
-                df = self.db.get_filtered_sorted_df(table_name=self.table_switcher.GetStringSelection(), sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
-            if len(df) < min_data_count:
-                wx.MessageBox(f"Unable to perform operation, please load a table with at least {min_data_count:,} rows", "Invalid operation", wx.OK | wx.ICON_ERROR)
-                return
-            callback(df=df[selected_columns], columns=selected_columns)
-        column_dialog.Destroy()
+        try:
+            if column_dialog.ShowModal() == wx.ID_OK:
+                selected_columns = [columns[i] for i in column_dialog.selected_columns]
+                if not column_dialog.ignore_filters and (self.sort_column or self.search_query):
+                    df = self.db.get_filtered_sorted_df(table_name=table_name, sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
+                elif sample_size:
+                    df = self.db.get_sample(table_name=table_name, n=sample_size)
+                else:
+                    df = self.db.get_df(table_name=table_name)
+                if len(df) < min_data_count:
+                    wx.MessageBox(f"Unable to perform operation, please load a table with at least {min_data_count:,} rows", "Invalid operation", wx.OK | wx.ICON_ERROR)
+                    return
+                # The schema of SQLite tables follows the declared types, columns holding values of other types only show up once loaded
+                if valid_dtypes and (invalid_columns := [col for col in selected_columns if self.db.get_dtype_kind(df[col].dtype) not in valid_dtypes]):
+                    wx.MessageBox(f"Unable to perform operation, the column{plural_suffix(len(invalid_columns))} \"{', '.join(invalid_columns)}\" contain{'s' if len(invalid_columns) == 1 else ''} values of an unsupported type", "Invalid operation", wx.OK | wx.ICON_ERROR)
+                    return
+                callback(df=df[selected_columns], columns=selected_columns)
+        finally:
+            column_dialog.Destroy()
 
     def on_descriptive_statistics(self, df: pd.DataFrame, columns: list):
         """
@@ -400,8 +448,12 @@ class SQLiteViewer(wx.Frame):
         :param df: The dataframe to analyze
         :param columns: The names of the columns to analyze as a list
         """
-        message = "\n".join([f"{column}:\n{df[column].describe(datetime_is_numeric=True)}\n" for column in columns])
-        wx.MessageBox(message, "Descriptive statistics", wx.OK | wx.ICON_INFORMATION)
+        try:
+            stats = df[columns].describe(include="all", datetime_is_numeric=True)
+        except TypeError:
+            # pandas 2 removed the keyword and always describes datetime columns numerically
+            stats = df[columns].describe(include="all")
+        wx.MessageBox(stats.to_string(na_rep=""), "Descriptive statistics", wx.OK | wx.ICON_INFORMATION)
 
     def on_histogram(self, df: pd.DataFrame, columns: list):
         """
@@ -410,10 +462,10 @@ class SQLiteViewer(wx.Frame):
         :param df: The dataframe to plot
         :param columns: The names of the columns to plot as a list
         """
-        if not (any(df[graph].dtype != "datetime64[ns]" for graph in columns) and any(df[graph].dtype == "datetime64[ns]" for graph in columns)):
-            frame = MatplotlibFrame(parent=self)
-            frame.plot_histogram(df=df, columns=columns)
-            frame.Show()
+        is_datetime = (df[columns].dtypes.map(lambda dtype: dtype.kind) == "M").to_numpy()
+        if not (is_datetime.any() and not is_datetime.all()):
+            thread = MatplotlibFrame(parent=self).plot_histogram(df=df, columns=columns)
+            self.progress_dialog_when_slow(thread=thread)
         else:
             wx.MessageBox("Unable to plot a histogram for a mix of numerical and datetime columns", "Invalid operation", wx.OK | wx.ICON_ERROR)
    
@@ -424,9 +476,8 @@ class SQLiteViewer(wx.Frame):
         :param df: The dataframe to plot
         :param columns: The names of the column combination to plot
         """
-        frame = MatplotlibFrame(parent=self)
-        frame.plot_scatter(df=df, column_combinations=[[columns[0], columns[1]]])
-        frame.Show()
+        thread = MatplotlibFrame(parent=self).plot_scatter(df=df, column_combinations=[[columns[0], columns[1]]])
+        self.progress_dialog_when_slow(thread=thread)
 
     def on_correlation_matrix(self, df: pd.DataFrame, columns: list):
         """
@@ -435,9 +486,8 @@ class SQLiteViewer(wx.Frame):
         :param df: The dataframe to analyze
         :param columns: The names of the columns to analyze as a list
         """
-        frame = MatplotlibFrame(parent=self)
-        frame.plot_correlation_matrix(df=df, columns=columns)
-        frame.Show()
+        thread = MatplotlibFrame(parent=self).plot_correlation_matrix(df=df, columns=columns)
+        self.progress_dialog_when_slow(thread=thread)
 
     def on_best_fitted_distribution(self, df: pd.DataFrame, columns: list):
         """
@@ -447,23 +497,16 @@ class SQLiteViewer(wx.Frame):
         :param columns: The name of the column to analyze
         """
         def _show_best_fitted_distribution(df: pd.DataFrame, columns: list, dist_names: list, params: list):
-            frame = MatplotlibFrame(parent=self)
-            frame.plot_histogram(df=df, columns=columns, dist_names=dist_names, params=params)
-            frame.Show()
+            thread = MatplotlibFrame(parent=self).plot_histogram(df=df, columns=columns, dist_names=dist_names, params=params)
+            self.progress_dialog_when_slow(thread=thread)
 
         def _worker():
             dist_names = ["norm", "expon", "pareto", "lognorm", "gamma", "beta", "uniform", "dweibull"]
-            best_dist, best_params, best_aic = None, None, math.inf
             
             try:
-                data = df[columns[0]].dropna()
-                for dist_name in dist_names:
-                    params = getattr(st, dist_name).fit(data)
-                    ll = getattr(st, dist_name).logpdf(data, *params).sum()
-                    aic = 2 * len(params) - 2 * ll
-
-                    if aic < best_aic:
-                        best_aic, best_dist, best_params = aic, dist_name, params
+                data = df[columns[0]].dropna().to_numpy(dtype=np.float64, copy=False)
+                data.setflags(write=False)
+                best_dist, best_params = find_best_fitted_distribution(data=data, dist_names=dist_names)
 
                 wx.CallAfter(_show_best_fitted_distribution, df=df, columns=columns, dist_names=[best_dist], params=[best_params])
             except Exception as e:
@@ -472,7 +515,7 @@ class SQLiteViewer(wx.Frame):
             
         thread = threading.Thread(target=_worker, name="best_fitted_distribution", daemon=True)
         thread.start()
-        wx.CallLater(600, lambda: self.progress_dialog(thread=thread) if thread.is_alive() else None)
+        self.progress_dialog_when_slow(thread=thread)
 
     def on_regression_analysis(self, df: pd.DataFrame, columns: list):
         """
@@ -482,13 +525,13 @@ class SQLiteViewer(wx.Frame):
         :param columns: The names of the columns to analyze as a list
         """
         try:
-            min_len = min(len(df[column].dropna().values) for column in columns)
-            data = [df[column].dropna().values[:min_len] for column in columns]
+            data = [df[column].dropna().to_numpy() for column in columns]
+            min_len = min(len(values) for values in data)
+            data = [values[:min_len] for values in data]
             result = st.linregress(*data)
 
-            frame = MatplotlibFrame(parent=self)
-            frame.plot_scatter(df=df, column_combinations=[[columns[0], columns[1]]], regression_line=True, regression_line_params=result)
-            frame.Show()
+            thread = MatplotlibFrame(parent=self).plot_scatter(df=df, column_combinations=[[columns[0], columns[1]]], regression_line=True, regression_line_params=result)
+            self.progress_dialog_when_slow(thread=thread)
         except Exception as e:
             wx.MessageBox(f"Error performing regression analysis due to:\n{str(e)}", "Error", wx.OK | wx.ICON_ERROR)
             raise e
@@ -501,7 +544,7 @@ class SQLiteViewer(wx.Frame):
         :param columns: The names of the columns to analyze as a list
         """
         try:
-            data = [df[column].dropna().values for column in columns]
+            data = [df[column].dropna().to_numpy() for column in columns]
             result = st.f_oneway(*data)
             wx.MessageBox(f"ANOVA test results:\nF-statistic: {result.statistic:.4f}\nP-value: {result.pvalue:.4f}", "ANOVA test results", wx.OK | wx.ICON_INFORMATION)
         except Exception as e:
@@ -512,7 +555,7 @@ class SQLiteViewer(wx.Frame):
         """
         Sorts the table by the clicked column toggling between ascending, descending and the original order
         """
-        column = self.list_ctrl.GetColumn(event.GetColumn()).GetText()
+        column = self.list_ctrl.columns[event.GetColumn()]
         if self.sort_column == column:
             if not self.sort_order:
                 self.sort_column = None
@@ -526,9 +569,11 @@ class SQLiteViewer(wx.Frame):
 
     def on_select_cell(self, event):
         """
-        Updates the status bar with the number of selected rows
+        Updates the status bar with the number of selected rows, unless it already shows that text
         """
-        self.SetStatusText(f"Selected {(row_count := self.list_ctrl.GetSelectedItemCount())} row{'s'[:row_count^1]}")
+        status_text = f"Selected {(row_count := self.list_ctrl.GetSelectedItemCount()):,} row{plural_suffix(row_count)}"
+        if status_text != self.GetStatusBar().GetStatusText():
+            self.SetStatusText(status_text)
 
     def on_switch_table(self, event):
         """
@@ -538,11 +583,20 @@ class SQLiteViewer(wx.Frame):
             self.reset_state()
             self.load_table_data(table_name=self.table_switcher.GetStringSelection(), page_size=self.items_per_page)
 
+    def on_search_text(self, event):
+        """
+        Restarts the search timer on every edit of the search box, so a search only runs once typing has paused
+        """
+        self.search_timer.StartOnce(self.SEARCH_DELAY_MS)
+
     def on_search(self, event):
         """
-        Reloads the table with the search query applied
+        Reloads the table with the search query applied, or with the search removed if the search box was emptied
         """
-        if self.db and (search_query := self.search_ctrl.GetValue()):
+        self.search_timer.Stop()
+        if not (search_query := self.search_ctrl.GetValue()):
+            self.on_search_cancel(event) if self.search_query else None
+        elif self.db and search_query != self.search_query:
             self.current_page, self.search_query = 1, search_query
             self.search_ctrl.ShowCancelButton(True)
             self.load_table_data(table_name=self.table_switcher.GetStringSelection(), page_number=self.current_page, page_size=self.items_per_page, sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
@@ -560,20 +614,25 @@ class SQLiteViewer(wx.Frame):
 
     def on_page_change(self, event):
         """
-        Loads the next or previous page while wrapping around if necessary
+        Loads the next or previous page while wrapping around if necessary, wrapping back from the first page loads the last page even if the rows were not all counted yet
         """
         if self.db and self.total_pages > 1:
-            self.current_page = ((self.current_page - 2 if event.GetId() == wx.ID_BACKWARD else self.current_page) % self.total_pages) + 1
-            self.load_table_data(table_name=self.table_switcher.GetStringSelection(), page_number=self.current_page, page_size=self.items_per_page, sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
+            if event.GetId() == wx.ID_BACKWARD and self.current_page == 1 and not self.is_row_count_exact:
+                page_number = None
+            else:
+                page_number = self.current_page = ((self.current_page - 2 if event.GetId() == wx.ID_BACKWARD else self.current_page) % self.total_pages) + 1
+            self.load_table_data(table_name=self.table_switcher.GetStringSelection(), page_number=page_number, page_size=self.items_per_page, sort_column=self.sort_column, sort_order=self.sort_order, search_query=self.search_query)
 
     def reset_state(self):
         """
         Resets the state of the application to a semi default state
         """
         self.SetStatusText("Processing...")
+        self.search_timer.Stop()
         self.search_ctrl.ChangeValue("")
         self.search_ctrl.ShowCancelButton(False)
         self.search_query, self.current_page, self.total_pages, self.sort_column, self.sort_order = None, 1, 0, None, False
+        self.is_row_count_exact = True
 
 
 if __name__ == "__main__":
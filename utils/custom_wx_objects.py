@@ -1,13 +1,28 @@
-import matplotlib.pyplot as plt
+import functools
+import matplotlib.dates as mdates
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+from matplotlib.figure import Figure
 import numpy as np
 import pandas as pd
 import re
 import seaborn as sns
 import scipy.stats as st
+import threading
 import wx
 
 
+def plural_suffix(count: int) -> str:
+    """
+    Gets the suffix to pluralize a noun for the specified count
+
+    :param count: The number of items
+    :return: An empty string for exactly one item, otherwise "s"
+    """
+    return "" if count == 1 else "s"
+
+
 class ColumnSelectionDialog(wx.Dialog):
     """
     A custom implementation of wx.Dialog to select columns from a listbox
@@ -42,17 +57,79 @@ class ColumnSelectionDialog(wx.Dialog):
     def _on_ok(self, event):
         self.selected_columns = self.listbox.GetSelections()
         if self.min_count and len(self.selected_columns) < self.min_count:
-            wx.MessageBox(f"Please select at least {self.min_count} column{'s'[:self.min_count^1]}", "Invalid operation", wx.OK | wx.ICON_ERROR)
+            wx.MessageBox(f"Please select at least {self.min_count} column{plural_suffix(self.min_count)}", "Invalid operation", wx.OK | wx.ICON_ERROR)
             return
         elif self.max_count and len(self.selected_columns) > self.max_count:
-            wx.MessageBox(f"Please select no more than {self.max_count} column{'s'[:self.max_count^1]}", "Invalid operation", wx.OK | wx.ICON_ERROR)
+            wx.MessageBox(f"Please select no more than {self.max_count} column{plural_suffix(self.max_count)}", "Invalid operation", wx.OK | wx.ICON_ERROR)
             return
         self.EndModal(wx.ID_OK)
 
 
+class VirtualListCtrl(wx.ListCtrl):
+    """
+    A custom implementation of wx.ListCtrl in virtual report mode, which only requests the texts of the visible cells from a pre-stringified array
+
+    :param parent: The parent window
+    """
+    def __init__(self, parent: wx.Window):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.cells = np.empty((0, 0), dtype=str)
+        self.widest_cells = np.empty(0, dtype=str)
+        self.columns = []
+
+    def ClearAll(self):
+        super().ClearAll()
+        self.cells, self.widest_cells, self.columns = np.empty((0, 0), dtype=str), np.empty(0, dtype=str), []
+
+    def set_columns(self, columns: list, widths: list):
+        """
+        Replaces all columns and items with the specified columns, whose names are kept in self.columns so they can be looked up without querying the native control
+
+        :param columns: The names of the columns in their original order
+        :param widths: The width of each column
+        """
+        self.ClearAll()
+        for i, (column, width) in enumerate(zip(columns, widths)):
+            self.InsertColumn(i, column, width=width)
+        self.columns = list(columns)
+
+    def set_cells(self, cells: np.ndarray, widest_cells: np.ndarray):
+        """
+        Sets the cells to display and updates the item count accordingly
+
+        :param cells: A two-dimensional array of strings with one row per item and one column per list column
+        :param widest_cells: The longest string of each column, used to auto size the columns
+        """
+        self.cells, self.widest_cells = cells, widest_cells
+        self.SetItemCount(len(cells))
+        self.Refresh()
+
+    def OnGetItemText(self, item: int, column: int) -> str:
+        return self.cells[item, column]
+
+
+def _plot_in_background(plot: callable) -> callable:
+    # Runs a plot method of MatplotlibFrame in a separate thread, the returned figure is attached to the frame on the main thread
+    @functools.wraps(plot)
+    def wrapper(self, *args, **kwargs) -> threading.Thread:
+        def _worker():
+            try:
+                fig = plot(self, *args, **kwargs)
+            except Exception as e:
+                wx.CallAfter(self.Destroy)
+                wx.CallAfter(wx.MessageBox, f"Error creating plot due to:\n{str(e)}", "Error", wx.OK | wx.ICON_ERROR)
+                raise e
+            wx.CallAfter(self._draw_plot, fig)
+
+        thread = threading.Thread(target=_worker, name="plot", daemon=True)
+        thread.start()
+        return thread
+    return wrapper
+
+
 class MatplotlibFrame(wx.Frame):
     """
-    A custom implementation of wx.Frame to display matplotlib plots
+    A custom implementation of wx.Frame to display matplotlib plots, the figures are built in a separate thread without pyplot and the frame is shown once the figure is ready
     
     :param parent: The parent window
     """
@@ -60,6 +137,10 @@ class MatplotlibFrame(wx.Frame):
 
     def __init__(self, parent):
         super().__init__(parent)
+        self.title, self.figure = "", None
+        # The style changes the global rcParams, so it is applied here on the main thread rather than by the plot threads
+        sns.set_style("darkgrid")
+        sns.set_palette("colorblind")
 
         menubar = wx.MenuBar()
         plot_menu = wx.Menu()
@@ -71,35 +152,60 @@ class MatplotlibFrame(wx.Frame):
         self.Bind(wx.EVT_MENU, self._on_save_button, save_item)
         self.Bind(wx.EVT_MENU, self._on_exit_button, exit_item)
 
-    def _configure_plot(self, title: str) -> tuple:
-        sns.set_style("darkgrid")
-        sns.set_palette("colorblind")
-        fig, ax = plt.subplots(figsize=(6, 4))
-        canvas = FigureCanvas(self, -1, fig)
-        sizer = wx.BoxSizer(wx.VERTICAL)
-        sizer.Add(canvas, 1, wx.EXPAND)
-        self.SetSizerAndFit(sizer)
-        self.SetTitle(f"SQLite Viewer: Showing {title}")
-        return fig, ax
+    def _configure_plot(self) -> tuple:
+        # An Agg canvas lets the figure be laid out off the main thread, it is replaced by the wx canvas in _draw_plot
+        fig = Figure(figsize=(6, 4))
+        FigureCanvasAgg(fig)
+        return fig, fig.subplots()
 
-    def _sample_data(self, df: pd.DataFrame, sample_size: int, ax: plt.Axes) -> pd.DataFrame:
+    def _sample_data(self, df: pd.DataFrame, sample_size: int, ax: Axes) -> pd.DataFrame:
         if len(df) > sample_size:
             df = df.sample(n=sample_size, random_state=1)
-            ax.text(0.05, 0.95, f"Sampled {sample_size:,} rows", transform=ax.transAxes, fontsize=12, verticalalignment="top", horizontalalignment="left", bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
+            df.attrs["sampled"] = True
+        self._annotate_sample(df, ax)
         return df
+
+    def _annotate_sample(self, df: pd.DataFrame, ax: Axes):
+        if df.attrs.get("sampled"):
+            ax.text(0.05, 0.95, f"Sampled {len(df):,} rows", transform=ax.transAxes, fontsize=12, verticalalignment="top", horizontalalignment="left", bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
+
+    @staticmethod
+    def _to_float_array(series: pd.Series) -> np.ndarray:
+        # Datetimes become Matplotlib date numbers, missing values become NaN
+        return mdates.date2num(series) if series.dtype.kind == "M" else series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @staticmethod
+    def _minmax_downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+        # Splits x into n_out / 2 equally wide bins and keeps the points with the lowest and highest y of each bin, non-finite points cannot be binned or drawn and are dropped
+        finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        if len(finite) <= n_out:
+            return finite
+        x, y = x[finite], y[finite]
+        order = np.argsort(x, kind="stable")
+        x_sorted, n_bins = x[order], n_out // 2
+        x_range = (x_sorted[-1] - x_sorted[0]) or 1
+        bin_ids = np.minimum(((x_sorted - x_sorted[0]) / x_range * n_bins).astype(np.int64), n_bins - 1)
+        by_bin_and_y = np.lexsort((y[order], bin_ids))
+        starts = np.flatnonzero(np.diff(bin_ids, prepend=-1))
+        ends = np.append(starts[1:], len(x)) - 1
+        return finite[np.unique(order[by_bin_and_y[np.concatenate((starts, ends))]])]
     
-    def _draw_plot(self, fig: plt.Figure, ax: plt.Axes):
-        plt.tight_layout()
+    def _draw_plot(self, fig: Figure):
+        if not self:
+            return
+        self.figure = fig
         canvas = FigureCanvas(self, -1, fig)
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(canvas, 1, wx.EXPAND)
         self.SetSizerAndFit(sizer)
+        self.SetTitle(f"SQLite Viewer: Showing {self.title}")
         canvas.draw()
+        self.Show()
 
     def _save_plot(self, file_path: str):
         if not file_path.lower().endswith((".png", ".jpg")):
             file_path += ".png"
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        self.figure.savefig(file_path, dpi=300, bbox_inches="tight")
 
     def _on_save_button(self, event):
         default_file = f"{self.title.lower().replace(' ', '-')}.png" if self.title else ""
@@ -112,6 +218,7 @@ class MatplotlibFrame(wx.Frame):
     def _on_exit_button(self, event):
         self.Destroy()
 
+    @_plot_in_background
     def plot_histogram(self, df: pd.DataFrame, columns: list, dist_names: list[str, ...] | None = None, params: list[tuple, ...] | None = None):
         """
         Plots a histogram of the specified columns and optionally the best fitted distribution too
@@ -120,38 +227,51 @@ class MatplotlibFrame(wx.Frame):
         :param columns: The columns to plot the histogram for
         :param dist_names: The names of the distributions to plot
         :param params: The parameters of the distributions to plot
+        :return: The thread building the figure, the frame is shown once it finishes
         """
         self.title = f"{'Best Fitted Distribution' if dist_names else 'Histogram'} \"{', '.join(columns)}\""
-        fig, ax = self._configure_plot(self.title)
+        fig, ax = self._configure_plot()
 
-        df = self._sample_data(df, self.SAMPLE_SIZE, ax)
-        hist_data = pd.concat([df[graph] for graph in columns])
+        self._annotate_sample(df, ax)
+        hist_data = pd.concat([df[graph] for graph in columns]) if len(columns) > 1 else df[columns[0]]
         log_scale_x = bool(abs(hist_data.skew()) > 2) if hist_data.dtype.kind in "biufc" else False
+        column_stats = df[columns].agg(["min", "max"]) if dist_names else None
         
         for i, graph in enumerate(columns):
-            sns.histplot(data=df, x=graph, ax=ax, stat="density", bins="auto", log_scale=log_scale_x, label=graph)   
+            values = self._to_float_array(df[graph].dropna())
+            if log_scale_x:
+                counts, log_edges = np.histogram(np.log10(values[values > 0]), bins="auto", density=True)
+                ax.stairs(counts, 10 ** log_edges, fill=True, alpha=0.75, label=graph)
+                ax.set_xscale("log")
+            else:
+                counts, edges = np.histogram(values, bins="auto", density=True)
+                ax.stairs(counts, edges, fill=True, alpha=0.75, label=graph)
+            ax.xaxis_date() if df[graph].dtype.kind == "M" else None
             if dist_names and params and i < min(len(dist_names), len(params)):
                 param_names = [name.strip() for name in getattr(st, dist_names[i]).shapes.split(",")] if getattr(st, dist_names[i]).shapes else []
                 param_names += ['loc'] if dist_names[i] in st._discrete_distns._distn_names else ['loc', 'scale']
                 param_str = ", ".join([f"{param_name}: {param:.2f}" for param_name, param in zip(param_names, params[i])])
 
+                graph_min, graph_max = column_stats.at["min", graph], column_stats.at["max", graph]
                 if log_scale_x:
-                    shift = abs(df[graph].min()) + 1 if df[graph].min() < 0 else 0
-                    x = np.logspace(np.log10(shift + df[graph].min()), np.log10(shift + df[graph].max()), 1000)
+                    shift = abs(graph_min) + 1 if graph_min < 0 else 0
+                    x = np.logspace(np.log10(shift + graph_min), np.log10(shift + graph_max), 1000)
                     pdf = getattr(st, dist_names[i]).pdf(x, *params[i])
                     # TODO: Fix y-axis scaling for log scale
                 else:
-                    x = np.linspace(df[graph].min(), df[graph].max(), 1000)
+                    x = np.linspace(graph_min, graph_max, 1000)
                     pdf = getattr(st, dist_names[i]).pdf(x, *params[i])
                 
-                plt.autoscale(False)
+                ax.autoscale(False)
                 line_color = sns.color_palette("dark", n_colors=len(columns))[i]
                 ax.plot(x, pdf, label=f"{dist_names[i]} ({param_str})", color=line_color, linestyle="dashed")
         
         ax.set_xlabel(f"{columns[0] if len(columns) == 1 else ' '}{' (log scale)' if log_scale_x else ''}")
         ax.legend(loc="lower left") if len(ax.get_legend_handles_labels()[0]) > 1 else ax.legend().remove()
-        self._draw_plot(fig, ax)
+        fig.tight_layout()
+        return fig
 
+    @_plot_in_background
     def plot_scatter(self, df: pd.DataFrame, column_combinations: list, regression_line: bool = False, regression_line_params: tuple | None = None):
         """
         Plots a scatter plot for the specified column combinations
@@ -160,18 +280,23 @@ class MatplotlibFrame(wx.Frame):
         :param column_combinations: The column combinations to plot as a nested list with the inner lists containing a pair of columns
         :param regression_line: Whether to plot a regression lines
         :param regression_line_params: The parameters of the regression line (slope, intercept, rvalue, pvalue, stderr), only displayed if there is one column combination
+        :return: The thread building the figure, the frame is shown once it finishes
         """
         self.title = f"Scatter Plot \"{', '.join([' / '.join(graph) for graph in column_combinations])}\""
-        fig, ax = self._configure_plot(self.title)
+        fig, ax = self._configure_plot()
 
         df = self._sample_data(df, self.SAMPLE_SIZE, ax)
-        scatter_data_x = pd.concat([df[graph[0]] for graph in column_combinations])
-        scatter_data_y = pd.concat([df[graph[1]] for graph in column_combinations])
+        scatter_data_x = pd.concat([df[graph[0]] for graph in column_combinations]) if len(column_combinations) > 1 else df[column_combinations[0][0]]
+        scatter_data_y = pd.concat([df[graph[1]] for graph in column_combinations]) if len(column_combinations) > 1 else df[column_combinations[0][1]]
         scatter_log_scale_x = bool(abs(scatter_data_x.skew()) > 2) if scatter_data_x.dtype.kind in "biufc" else False
         scatter_log_scale_y = bool(abs(scatter_data_y.skew()) > 2) if scatter_data_y.dtype.kind in "biufc" else False
         
+        n_out = int(fig.get_figwidth() * fig.dpi) * 4
         for i, graph in enumerate(column_combinations):
-            sns.scatterplot(data=df, x=graph[0], y=graph[1], ax=ax, label=f"{graph[0]} / {graph[1]}")
+            graph_data = df[graph].dropna()
+            x, y = self._to_float_array(graph_data[graph[0]]), self._to_float_array(graph_data[graph[1]])
+            x = np.log10(np.maximum(x, np.finfo(np.float64).tiny)) if scatter_log_scale_x else x
+            sns.scatterplot(data=graph_data.iloc[self._minmax_downsample(x, y, n_out)], x=graph[0], y=graph[1], ax=ax, label=f"{graph[0]} / {graph[1]}")
             if regression_line:
                 line_color = sns.color_palette("dark", n_colors=len(column_combinations))[i]
                 sns.regplot(data=df, x=graph[0], y=graph[1], ax=ax, scatter=False, color=line_color, label=f"{graph[0]} / {graph[1]}")
@@ -179,21 +304,28 @@ class MatplotlibFrame(wx.Frame):
                     text_result = f"Slope: {regression_line_params.slope:.4f}\nIntercept: {regression_line_params.intercept:.4f}\nR-value: {regression_line_params.rvalue:.4f}\nP-value: {regression_line_params.pvalue:.4f}\nStandard error: {regression_line_params.stderr:.4f}"
                     ax.text(0.95, 0.95, text_result, transform=ax.transAxes, fontsize=12, verticalalignment="top", horizontalalignment="right", bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
         
-        plt.xscale("log") if scatter_log_scale_x else None
-        plt.yscale("log") if scatter_log_scale_y else None
+        ax.set_xscale("log") if scatter_log_scale_x else None
+        ax.set_yscale("log") if scatter_log_scale_y else None
         ax.set_xlabel(f"{', '.join([graph[0] for graph in column_combinations])}{' (log scale)' if scatter_log_scale_x else ''}")
         ax.set_ylabel(f"{', '.join([graph[1] for graph in column_combinations])}{' (log scale)' if scatter_log_scale_y else ''}")
         ax.legend(loc="lower left") if len(ax.get_legend_handles_labels()[0]) > 1 else ax.legend().remove()
-        self._draw_plot(fig, ax)
+        fig.tight_layout()
+        return fig
 
+    @_plot_in_background
     def plot_correlation_matrix(self, df: pd.DataFrame, columns: list):
         """
         Plots a correlation matrix for the specified columns
 
         :param df: The dataframe to plot
         :param columns: The names of the columns to plot as a list
+        :return: The thread building the figure, the frame is shown once it finishes
         """
         self.title = f"Correlation Matrix \"{', '.join(columns)}\""
-        fig, ax = self._configure_plot(self.title)
-        sns.heatmap(data=df[columns].corr(numeric_only=False), annot=True, fmt=".2f", ax=ax)
-        self._draw_plot(fig, ax)
+        fig, ax = self._configure_plot()
+        values = np.column_stack([self._to_float_array(df[column]) for column in columns])
+        # np.corrcoef has no pairwise handling of missing values, so columns with gaps fall back to DataFrame.corr
+        corr = df[columns].corr(numeric_only=False) if np.isnan(values).any() else pd.DataFrame(np.corrcoef(values, rowvar=False), index=columns, columns=columns)
+        sns.heatmap(data=corr, annot=True, fmt=".2f", ax=ax)
+        fig.tight_layout()
+        return fig
@@ -1,7 +1,20 @@
-from functools import lru_cache
+from collections import OrderedDict
+import numpy as np
 import os.path as path
 import pandas as pd
 import sqlite3
+import threading
+
+try:
+    import adbc_driver_sqlite.dbapi as adbc
+except ImportError:
+    adbc = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
 
 
 class DataframeConnection:
@@ -10,9 +23,32 @@ class DataframeConnection:
 
     :param db_file: The path to the database file
     """
+    SQLITE_FILE_TYPES = (".db", ".db3", ".sqlite", ".sqlite3")
+    DF_CACHE_SIZE = 3
+    PAGE_CACHE_SIZE = 8
+    CSV_ENGINES = ("pyarrow", "c", "python")
+    # The pyarrow engine of pandas only accepts on_bad_lines from pandas 2.2 on
+    PYARROW_CSV_BAD_LINES = tuple(int(part) for part in pd.__version__.split(".")[:2]) >= (2, 2)
+
     def __init__(self, db_file: str):
         self.db_file = db_file
         self.file_type = path.splitext(db_file)[1].lower()
+        self._df_cache, self._page_cache = OrderedDict(), OrderedDict()
+        self._df_locks = {}
+        self._cache_master_lock = threading.Lock()
+        self._str_cache = {}
+        self._row_counts = {}
+        self._schemas = {}
+        self._conn, self._conn_lock = None, threading.Lock()
+        if self.is_sqlite:
+            self._conn = sqlite3.connect(db_file, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+
+    @property
+    def is_sqlite(self) -> bool:
+        """
+        Whether the database file is an SQLite file, in which case paging, sorting and searching are done by SQLite
+        """
+        return self.file_type in self.SQLITE_FILE_TYPES
 
     def get_table_or_sheet_names(self) -> list:
         """
@@ -20,7 +56,7 @@ class DataframeConnection:
 
         :return: A list of table or sheet names
         """
-        if self.file_type in (".db", ".db3", ".sqlite", ".sqlite3"):
+        if self.is_sqlite:
             return self._get_sqlite_table_names()
         elif self.file_type == ".xlsx":
             return self._get_excel_sheet_names()
@@ -28,8 +64,16 @@ class DataframeConnection:
             return ["CSV file"]
         else:
             raise ValueError(f"Unsupported file type: {self.file_type}")
+
+    def close(self):
+        """
+        Closes the persistent connection to the database file if there is one
+        """
+        if self._conn is not None:
+            with self._conn_lock:
+                self._conn.close()
+            self._conn = None
     
-    @lru_cache(maxsize=1)
     def get_df(self, table_name: str) -> pd.DataFrame:
         """
         Gets a dataframe of the data in the specified table or sheet
@@ -37,8 +81,11 @@ class DataframeConnection:
         :param table_name: The name of the table or sheet to get the data from
         :return: A dataframe of the data in the specified table or sheet
         """
-        if self.file_type in (".db", ".db3", ".sqlite", ".sqlite3"):
-            return self._get_sqlite_dataframe(table_name)
+        return self._get_cached_df(cache=self._df_cache, max_size=self.DF_CACHE_SIZE, key=(table_name, None, False, None), load=lambda: self._load_df(table_name))
+
+    def _load_df(self, table_name: str) -> pd.DataFrame:
+        if self.is_sqlite:
+            return self._get_sqlite_arrow_dataframe(table_name) if adbc else self._get_sqlite_dataframe(table_name)
         elif self.file_type == ".xlsx":
             return self._get_excel_dataframe(table_name)
         elif self.file_type == ".csv":
@@ -46,7 +93,6 @@ class DataframeConnection:
         else:
             raise ValueError(f"Unsupported file type: {self.file_type}")
     
-    @lru_cache(maxsize=1)
     def get_filtered_sorted_df(self, table_name: str, sort_column: str | None = None, sort_order: bool = False, search_query: str | None = None) -> pd.DataFrame:
         """
         Gets a filtered and sorted dataframe of the data in the specified table or sheet
@@ -57,34 +103,281 @@ class DataframeConnection:
         :param search_query: The string to search for in the dataframe
         :return: A filtered and sorted dataframe
         """
-        df = self.get_df(table_name=table_name)
-        if search_query:
-            df = df[df.astype(str).apply(lambda row: row.str.contains(search_query, case=False, regex=False)).any(axis=1)]
+        if not sort_column and not search_query:
+            return self.get_df(table_name=table_name)
+        if self.is_sqlite:
+            # Filtered by the same LIKE clause as the pages, so analyses see exactly the rows shown in the table
+            key = ("sqlite", table_name, sort_column, sort_order if sort_column else False, search_query or None)
+            return self._get_cached_df(cache=self._df_cache, max_size=self.DF_CACHE_SIZE, key=key, load=lambda: self._get_sqlite_page(table_name, 0, None, sort_column, sort_order, search_query))
+        search_query = search_query.casefold() if search_query else None
+        key = (table_name, sort_column, sort_order if sort_column else False, search_query)
+        return self._get_cached_df(cache=self._df_cache, max_size=self.DF_CACHE_SIZE, key=key, load=lambda: self._filter_and_sort_df(*key))
+
+    def _filter_and_sort_df(self, table_name: str, sort_column: str | None, sort_order: bool, search_query: str | None) -> pd.DataFrame:
+        # Expects search_query to be casefolded already, it is matched case sensitively against the casefolded search columns
         if sort_column:
-            df = df.sort_values(by=sort_column, ascending=sort_order)
+            # Sorted searches start from the cached unsorted result, which get_row_count counts as well, so the search mask is only computed once per query
+            df = self.get_filtered_sorted_df(table_name=table_name, search_query=search_query) if search_query else self.get_df(table_name=table_name)
+            return df.sort_values(by=sort_column, ascending=sort_order)
+        df = self.get_df(table_name=table_name)
+        mask = np.zeros(len(df), dtype=bool)
+        for values in self._get_search_columns(table_name, df).values():
+            mask |= pc.fill_null(pc.match_substring(values, search_query), False).to_numpy(zero_copy_only=False) if pc else values.str.contains(search_query, regex=False, na=False).to_numpy(dtype=bool)
+            if mask.all():
+                break
+        return df[mask]
+
+    def _get_search_columns(self, table_name: str, df: pd.DataFrame) -> dict:
+        # Stringifies and casefolds every column once per table (as Arrow arrays if pyarrow is available), text columns come first as they are the most likely to match
+        search_columns = self._str_cache.get(table_name)
+        if search_columns is None:
+            text_cols = [column for column in df.columns if df[column].dtype == object or pd.api.types.is_string_dtype(df[column])]
+            other_cols = [column for column in df.columns if column not in text_cols]
+            # Missing values are blanked in every column, as astype(str) would otherwise turn them into searchable "nan" or "NaT"
+            search_columns = {column: df[column].astype(str).where(df[column].notna(), "").str.casefold() for column in text_cols + other_cols}
+            if pa:
+                search_columns = {column: pa.array(series, type=pa.large_string()) for column, series in search_columns.items()}
+            self._str_cache = {table_name: search_columns}
+        return search_columns
+
+    def _get_cached_df(self, cache: OrderedDict, max_size: int, key: tuple, load: callable) -> pd.DataFrame:
+        # One lock per key, so racing threads wait for a single load of the same dataframe instead of loading it twice
+        with self._cache_master_lock:
+            key_lock = self._df_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._cache_master_lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+            df = load()
+            with self._cache_master_lock:
+                cache[key] = df
+                while len(cache) > max_size:
+                    evicted_key, _ = cache.popitem(last=False)
+                    self._df_locks.pop(evicted_key, None)
+            return df
+
+    def get_schema(self, table_name: str) -> dict:
+        """
+        Gets the kind of data and the number of non-null values of every column in the specified table or sheet, for SQLite files without loading the table
+
+        :param table_name: The name of the table or sheet to describe
+        :return: A dict mapping each column name to a tuple of its kind ("number", "datetime" or "object") and its non-null count
+        """
+        if table_name not in self._schemas:
+            self._schemas[table_name] = self._get_sqlite_schema(table_name) if self.is_sqlite else self._get_df_schema(table_name)
+        return self._schemas[table_name]
+
+    def _get_df_schema(self, table_name: str) -> dict:
+        df = self.get_df(table_name=table_name)
+        kinds = df.dtypes.map(self.get_dtype_kind)
+        return dict(zip(df.columns, zip(kinds, df.notna().sum().tolist())))
+
+    def get_sample(self, table_name: str, n: int) -> pd.DataFrame:
+        """
+        Gets a random sample of at most n rows of the specified table or sheet, for SQLite files the sample is drawn by SQLite so the other rows are never loaded
+
+        :param table_name: The name of the table or sheet to sample
+        :param n: The maximum number of rows to sample
+        :return: A dataframe of the sampled rows, with attrs["sampled"] set if rows were left out
+        """
+        if self.is_sqlite:
+            if self.get_row_count(table_name=table_name)[0] <= n:
+                return self.get_df(table_name=table_name)
+            df = self._get_sqlite_dataframe(table_name, limit=n, order_by=" ORDER BY RANDOM()")
+        else:
+            df = self.get_df(table_name=table_name)
+            if len(df.index) <= n:
+                return df
+            df = df.sample(n=n, random_state=1)
+        df.attrs["sampled"] = True
         return df
 
+    def get_page(self, table_name: str, offset: int, limit: int, sort_column: str | None = None, sort_order: bool = False, search_query: str | None = None) -> pd.DataFrame:
+        """
+        Gets a single page of the filtered and sorted data in the specified table or sheet
+
+        :param table_name: The name of the table or sheet to get the data from
+        :param offset: The number of rows to skip
+        :param limit: The maximum number of rows to return
+        :param sort_column: The name of the column to sort by
+        :param sort_order: The order to sort by, True for ascending, False for descending
+        :param search_query: The string to search for in the dataframe
+        :return: A dataframe containing at most limit rows
+        """
+        key = ("page", table_name, offset, limit, sort_column, sort_order if sort_column else False, search_query or None)
+        return self._get_cached_df(cache=self._page_cache, max_size=self.PAGE_CACHE_SIZE, key=key, load=lambda: self._load_page(*key[1:]))
+
+    def _load_page(self, table_name: str, offset: int, limit: int, sort_column: str | None, sort_order: bool, search_query: str | None) -> pd.DataFrame:
+        if self.is_sqlite:
+            return self._get_sqlite_page(table_name, offset, limit, sort_column, sort_order, search_query)
+        df = self.get_filtered_sorted_df(table_name=table_name, sort_column=sort_column, sort_order=sort_order, search_query=search_query)
+        return df.iloc[offset:offset+limit]
+
+    def get_row_count(self, table_name: str, search_query: str | None = None, limit: int | None = None) -> tuple[int, bool]:
+        """
+        Gets the number of rows in the specified table or sheet that match the search query
+
+        :param table_name: The name of the table or sheet to count the rows of
+        :param search_query: The string to search for in the dataframe
+        :param limit: The number of matching rows after which a search in an SQLite file stops counting, as an exact count has to scan the whole table
+        :return: A tuple of the number of matching rows and whether that number is exact, if not at least that many rows match
+        """
+        key = (table_name, search_query or None)
+        count, is_exact = self._row_counts.get(key, (0, False))
+        if not is_exact and (limit is None or count < limit):
+            if self.is_sqlite:
+                limit = limit if search_query else None
+                count = self._get_sqlite_row_count(table_name, search_query, limit)
+                is_exact = limit is None or count < limit
+            else:
+                count, is_exact = len(self.get_filtered_sorted_df(table_name=table_name, search_query=search_query).index), True
+            self._row_counts[key] = (count, is_exact)
+        return count, is_exact
+
+    @staticmethod
+    def _quote_identifier(identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def _get_sqlite_columns(self, table_name: str) -> list:
+        return list(self._get_sqlite_declared_types(table_name))
+
+    def _get_sqlite_declared_types(self, table_name: str) -> dict:
+        with self._conn_lock:
+            return {row[1]: row[2] for row in self._conn.execute(f"PRAGMA table_info({self._quote_identifier(table_name)})")}
+
+    def _build_sqlite_where(self, columns: list, search_query: str | None) -> tuple[str, list]:
+        if not search_query:
+            return "", []
+        pattern = "%" + search_query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        clause = " OR ".join(f"{self._quote_identifier(column)} LIKE ? ESCAPE '\\'" for column in columns)
+        return f" WHERE {clause}", [pattern] * len(columns)
+
+    def _get_sqlite_page(self, table_name: str, offset: int, limit: int | None, sort_column: str | None, sort_order: bool, search_query: str | None) -> pd.DataFrame:
+        columns = self._get_sqlite_columns(table_name)
+        where, params = self._build_sqlite_where(columns, search_query)
+        order_by = ""
+        if sort_column:
+            if sort_column not in columns:
+                raise ValueError(f"Unknown column: {sort_column}")
+            order_by = f" ORDER BY {self._quote_identifier(sort_column)} {'ASC' if sort_order else 'DESC'} NULLS LAST"
+        return self._get_sqlite_dataframe(table_name, limit=limit, offset=offset, where=where, params=params, order_by=order_by)
+
+    def _get_sqlite_row_count(self, table_name: str, search_query: str | None, limit: int | None = None) -> int:
+        where, params = self._build_sqlite_where(self._get_sqlite_columns(table_name), search_query)
+        # A bounded subquery lets SQLite stop scanning once limit rows have matched
+        query = f"SELECT COUNT(*) FROM {self._quote_identifier(table_name)}{where}" if limit is None else f"SELECT COUNT(*) FROM (SELECT 1 FROM {self._quote_identifier(table_name)}{where} LIMIT ?)"
+        with self._conn_lock:
+            return self._conn.execute(query, params if limit is None else (*params, limit)).fetchone()[0]
+
+    def _get_sqlite_schema(self, table_name: str) -> dict:
+        declared_types = self._get_sqlite_declared_types(table_name)
+        quoted_table = self._quote_identifier(table_name)
+        counts = ", ".join(f"COUNT({self._quote_identifier(column)})" for column in declared_types)
+        with self._conn_lock:
+            non_null_counts = self._conn.execute(f"SELECT {counts} FROM {quoted_table}").fetchone()
+            # Columns without a declared type take the type of their first stored value
+            for column, declared_type in declared_types.items():
+                if not declared_type:
+                    quoted_column = self._quote_identifier(column)
+                    first_type = self._conn.execute(f"SELECT typeof({quoted_column}) FROM {quoted_table} WHERE {quoted_column} IS NOT NULL LIMIT 1").fetchone()
+                    declared_types[column] = first_type[0] if first_type else ""
+        return {column: (self._get_sqlite_kind(declared_type), count) for (column, declared_type), count in zip(declared_types.items(), non_null_counts)}
+
+    @staticmethod
+    def get_dtype_kind(dtype) -> str:
+        """
+        Gets the kind of data of a loaded column, as used by get_schema
+
+        :param dtype: The dtype of the column
+        :return: "number", "datetime" or "object"
+        """
+        return "number" if dtype.kind in "iufc" else "datetime" if dtype.kind == "M" else "object"
+
+    @staticmethod
+    def _get_sqlite_kind(declared_type: str) -> str:
+        # Follows the converters of sqlite3.PARSE_DECLTYPES for dates and the SQLite affinity rules for numbers
+        declared_type = declared_type.upper()
+        if declared_type.split(" ")[0] in ("DATE", "TIMESTAMP"):
+            return "datetime"
+        if any(name in declared_type for name in ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")):
+            return "number"
+        return "object"
+
     def _get_sqlite_table_names(self) -> list:
-        with sqlite3.connect(self.db_file) as conn:
-            tables = pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)["name"].tolist()
-        return [name for name in tables if not name.startswith("sqlite_autoindex_")]
+        with self._conn_lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'")]
 
     def _get_excel_sheet_names(self) -> list:
-        return list(pd.read_excel(self.db_file, sheet_name=None).keys())
+        with pd.ExcelFile(self.db_file) as excel_file:
+            return excel_file.sheet_names
 
-    def _get_sqlite_dataframe(self, table_name: str) -> pd.DataFrame:
-        with sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES) as conn:
-            df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+    def _get_sqlite_dataframe(self, table_name: str, limit: int | None = None, offset: int = 0, where: str = "", params: list | None = None, order_by: str = "") -> pd.DataFrame:
+        query, params = f"SELECT * FROM {self._quote_identifier(table_name)}{where}{order_by}", list(params or [])
+        if limit is not None:
+            query, params = f"{query} LIMIT ? OFFSET ?", [*params, limit, offset]
+        with self._conn_lock:
+            df = pd.read_sql_query(query, self._conn, params=params)
+        return self._convert_sqlite_dates(table_name, df)
+
+    def _convert_sqlite_dates(self, table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        # sqlite3.PARSE_DECLTYPES yields date objects in an object column and ADBC yields strings, both readers return datetime64 columns instead
+        # The columns declared as DATE are listed in attrs["date_columns"], so they can still be displayed without a time
+        date_columns = []
+        for column, declared_type in self._get_sqlite_declared_types(table_name).items():
+            if column in df.columns and self._get_sqlite_kind(declared_type) == "datetime":
+                df[column] = pd.to_datetime(df[column], errors="coerce")
+                date_columns += [column] if declared_type.split(" ")[0].upper() == "DATE" else []
+        df.attrs["date_columns"] = date_columns
         return df
 
+    def _get_sqlite_arrow_dataframe(self, table_name: str) -> pd.DataFrame:
+        # The driver infers one type per column and silently stringifies columns holding several storage classes, those tables are read by sqlite3 instead
+        if self._has_mixed_sqlite_types(table_name):
+            return self._get_sqlite_dataframe(table_name)
+        try:
+            with adbc.connect(self.db_file) as conn, conn.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {self._quote_identifier(table_name)}")
+                df = cursor.fetch_arrow_table().to_pandas()
+        except adbc.Error:
+            return self._get_sqlite_dataframe(table_name)
+        return self._convert_sqlite_dates(table_name, df)
+
+    def _has_mixed_sqlite_types(self, table_name: str) -> bool:
+        columns = self._get_sqlite_columns(table_name)
+        if not columns:
+            return False
+        type_counts = ", ".join(f"COUNT(DISTINCT NULLIF(typeof({self._quote_identifier(column)}), 'null'))" for column in columns)
+        with self._conn_lock:
+            return max(self._conn.execute(f"SELECT {type_counts} FROM {self._quote_identifier(table_name)}").fetchone()) > 1
+
     def _get_excel_dataframe(self, table_name: str) -> pd.DataFrame:
-        return pd.read_excel(self.db_file, sheet_name=table_name, parse_dates=True, date_parser=pd.to_datetime)
+        return pd.read_excel(self.db_file, sheet_name=table_name, parse_dates=True)
 
     def _get_csv_dataframe(self) -> pd.DataFrame:
         # TODO: Fix CSV datetime parsing
         try:
-            return pd.read_csv(self.db_file, on_bad_lines="error", encoding="utf-8", engine="python", parse_dates=True, date_parser=pd.to_datetime)
+            return self._read_csv(on_bad_lines="error")
         except pd.errors.EmptyDataError:
             return pd.DataFrame()
         except (TypeError, ValueError):
-            return pd.read_csv(self.db_file, sep=";", on_bad_lines="warn", encoding="utf-8", engine="python", parse_dates=True, date_parser=pd.to_datetime)
+            return self._read_csv(sep=";", on_bad_lines="warn")
+
+    def _read_csv(self, **kwargs) -> pd.DataFrame:
+        # Tries the compiled readers first, an engine that is not installed or does not support an option falls through to the next one, parser errors are raised right away
+        *fast_engines, fallback_engine = self.CSV_ENGINES
+        for engine in fast_engines:
+            engine_kwargs = kwargs
+            if engine == "pyarrow" and not self.PYARROW_CSV_BAD_LINES:
+                # Older pyarrow readers always fail on bad lines, which only matches on_bad_lines="error"
+                if kwargs.get("on_bad_lines", "error") != "error":
+                    continue
+                engine_kwargs = {key: value for key, value in kwargs.items() if key != "on_bad_lines"}
+            try:
+                return pd.read_csv(self.db_file, encoding="utf-8", engine=engine, parse_dates=True, **engine_kwargs)
+            except ImportError:
+                continue
+            except ValueError as e:
+                if "not supported" not in str(e) and "does not support" not in str(e):
+                    raise
+        return pd.read_csv(self.db_file, encoding="utf-8", engine=fallback_engine, parse_dates=True, **kwargs)
@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import numpy as np
+from scipy.special import betaln, gammaln, xlog1py, xlogy
+import scipy.stats as st
+import warnings
+
+_POOL = None
+
+
+def _fit_norm(data: np.ndarray) -> tuple:
+    return data.mean(), data.std()
+
+
+def _fit_expon(data: np.ndarray) -> tuple:
+    return data.min(), data.mean() - data.min()
+
+
+def _fit_uniform(data: np.ndarray) -> tuple:
+    return data.min(), np.ptp(data)
+
+
+# Maximum likelihood estimates with a closed form, these skip the numerical optimizer of rv_continuous.fit
+CLOSED_FORM_FITS = {
+    "norm": _fit_norm,
+    "expon": _fit_expon,
+    "uniform": _fit_uniform
+}
+
+
+def _norm_logpdf_sum(data: np.ndarray, loc: float, scale: float) -> float:
+    z = (data - loc) / scale
+    return -0.5 * np.dot(z, z) - len(data) * (0.5 * np.log(2 * np.pi) + np.log(scale))
+
+
+def _expon_logpdf_sum(data: np.ndarray, loc: float, scale: float) -> float:
+    if data.min() < loc:
+        return -np.inf
+    return -(data.sum() - len(data) * loc) / scale - len(data) * np.log(scale)
+
+
+def _uniform_logpdf_sum(data: np.ndarray, loc: float, scale: float) -> float:
+    if (data.min() - loc) / scale < 0 or (data.max() - loc) / scale > 1:
+        return -np.inf
+    return -len(data) * np.log(scale)
+
+
+def _gamma_logpdf_sum(data: np.ndarray, a: float, loc: float, scale: float) -> float:
+    z = (data - loc) / scale
+    if z.min() < 0:
+        return -np.inf
+    return (xlogy(a - 1, z) - z).sum() - len(data) * (gammaln(a) + np.log(scale))
+
+
+def _beta_logpdf_sum(data: np.ndarray, a: float, b: float, loc: float, scale: float) -> float:
+    z = (data - loc) / scale
+    if z.min() < 0 or z.max() > 1:
+        return -np.inf
+    return (xlogy(a - 1, z) + xlog1py(b - 1, -z)).sum() - len(data) * (betaln(a, b) + np.log(scale))
+
+
+# Log-likelihoods written out by hand with scipy.special primitives, these skip the argument checks and broadcasting of rv_continuous.logpdf
+INLINE_LOGPDF_SUMS = {
+    "norm": _norm_logpdf_sum,
+    "expon": _expon_logpdf_sum,
+    "uniform": _uniform_logpdf_sum,
+    "gamma": _gamma_logpdf_sum,
+    "beta": _beta_logpdf_sum
+}
+
+
+def _fit_lognorm(data: np.ndarray) -> tuple:
+    # With loc fixed at 0 the MLE is the mean and standard deviation of log(data), whose squared deviations then sum to n, so log(data) is taken only once
+    if data.min() <= 0:
+        return (np.nan, 0.0, np.nan), -np.inf, 2
+    log_data = np.log(data)
+    s = log_data.std()
+    return (s, 0.0, np.exp(log_data.mean())), -log_data.sum() - len(data) * (np.log(s) + 0.5 * np.log(2 * np.pi) + 0.5), 2
+
+
+# Fits that produce their log-likelihood as a by-product, returning a tuple of the parameters, the log-likelihood and the number of free parameters (fixed ones do not count towards the AIC)
+FUSED_FITS = {
+    "lognorm": _fit_lognorm
+}
+
+# Fits with a fixed location of 0, these only apply to strictly positive data, the other distributions are fitted with a free location and scale
+POSITIVE_ONLY_FITS = {"lognorm"}
+
+
+def _fast_logpdf_sum(dist: st.rv_continuous, data: np.ndarray, params: tuple) -> float:
+    # Standardizes the data and calls the private _logpdf directly, the support is checked once for the whole array instead of per element
+    *shapes, loc, scale = params
+    z = (data - loc) / scale
+    lower, upper = dist.support(*shapes)
+    if z.min() < lower or z.max() > upper:
+        return -np.inf
+    return dist._logpdf(z, *shapes).sum() - len(data) * np.log(scale)
+
+
+def fit_distribution(dist_name: str, data: np.ndarray) -> tuple:
+    """
+    Fits the specified distribution to the data and calculates the Akaike information criterion of the fit, defined at module level so it can be sent to worker processes
+
+    :param dist_name: The name of the scipy.stats distribution to fit
+    :param data: The data to fit the distribution to
+    :return: A tuple of the distribution name, the fitted parameters and the AIC
+    """
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if dist_name in FUSED_FITS:
+            params, ll, n_free_params = FUSED_FITS[dist_name](data)
+        else:
+            dist = getattr(st, dist_name)
+            params = CLOSED_FORM_FITS[dist_name](data) if dist_name in CLOSED_FORM_FITS else dist.fit(data)
+            ll = INLINE_LOGPDF_SUMS[dist_name](data, *params) if dist_name in INLINE_LOGPDF_SUMS else _fast_logpdf_sum(dist, data, params)
+            n_free_params = len(params)
+    return dist_name, params, 2 * n_free_params - 2 * ll
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Created on first use, spawned rather than forked since the parent process runs a GUI with several threads
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def find_best_fitted_distribution(data: np.ndarray, dist_names: list) -> tuple:
+    """
+    Fits the specified distributions in separate worker processes and picks the one with the lowest Akaike information criterion
+
+    :param data: The data to fit the distributions to
+    :param dist_names: The names of the scipy.stats distributions to try
+    :return: A tuple of the name and the fitted parameters of the best distribution
+    """
+    dist_names = dist_names if data.min() > 0 else [dist_name for dist_name in dist_names if dist_name not in POSITIVE_ONLY_FITS]
+    global _POOL
+    try:
+        futures = [_get_pool().submit(fit_distribution, dist_name, data) for dist_name in dist_names]
+        results = [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A pool whose worker died rejects all further work, so it is replaced on the next call
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+        raise
+    # Failed fits have a NaN AIC, which must never be picked over a finite one
+    aics = np.nan_to_num(np.fromiter((aic for _, _, aic in results), dtype=np.float64, count=len(results)), nan=np.inf, posinf=np.inf, neginf=-np.inf)
+    best_dist, best_params, _ = results[int(np.argmin(aics))]
+    return best_dist, best_params